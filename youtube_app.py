@@ -5,11 +5,13 @@ Web interface for downloading YouTube videos
 """
 
 import streamlit as st
-import subprocess
-import sys
 import os
-import yt_dlp
-from pathlib import Path
+import functools
+import time
+import shutil
+import tempfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 
 # Set page config
 st.set_page_config(
@@ -20,7 +22,7 @@ st.set_page_config(
 )
 
 # Custom CSS
-st.markdown("""
+_CSS = """
 <style>
     .main {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -56,42 +58,130 @@ st.markdown("""
         font-weight: bold;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(_CSS, unsafe_allow_html=True)
 
 # Default download folder
 DOWNLOAD_FOLDER = os.path.expanduser("~/Downloads/YouTube")
 
-def get_quality_format(quality):
-    """Get the format string for the desired quality"""
-    quality_formats = {
-        "2160": "bestvideo[height<=2160][ext=mp4]+bestaudio[ext=m4a]/best[height<=2160][ext=mp4]/best",
-        "1080": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4]/best",
-        "720": "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]/best",
-        "480": "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[height<=480][ext=mp4]/best",
+# Maximum number of videos downloaded at the same time
+MAX_PARALLEL_DOWNLOADS = 4
+
+# Maximum number of video info lookups running at the same time
+MAX_PARALLEL_LOOKUPS = 4
+
+# How long extracted video info is reused, and for how many URLs at most
+INFO_CACHE_TTL = 3600
+INFO_CACHE_SIZE = 256
+
+# Folders with more MP4 files than this are stat'ed from several threads
+PARALLEL_STAT_THRESHOLD = 32
+STAT_WORKERS = 16
+
+# Format strings and display labels for each quality
+QUALITY_FORMATS = {
+    "2160": "bestvideo[height<=2160][ext=mp4]+bestaudio[ext=m4a]/best[height<=2160][ext=mp4]/best",
+    "1080": "bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/best[height<=1080][ext=mp4]/best",
+    "720": "bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/best[height<=720][ext=mp4]/best",
+    "480": "bestvideo[height<=480][ext=mp4]+bestaudio[ext=m4a]/best[height<=480][ext=mp4]/best",
+}
+
+QUALITY_LABELS = {
+    "2160": "4K (2160p)",
+    "1080": "1080p Full HD",
+    "720": "720p HD",
+    "480": "480p SD",
+}
+
+@st.cache_resource
+def _get_info_cache():
+    """Get the state the info lookups share across reruns and sessions
+    
+    The lookups run on pool threads, which have no script context for
+    Streamlit's cached functions, so the script thread passes this in.
+    """
+    return {
+        'lock': threading.Lock(),
+        'entries': {},              # URL -> (time extracted, info)
+        'ydl': threading.local(),   # each thread's YoutubeDL instance
     }
-    return quality_formats.get(quality, quality_formats["1080"])
 
-def get_video_info(url):
+def _get_ydl(cache):
+    """Get this thread's YoutubeDL instance for info lookups
+    
+    Instances keep unlocked state while extracting, so the threads fetching
+    video info at the same time must not share one.
+    """
+    ydl = getattr(cache['ydl'], 'instance', None)
+    if ydl is None:
+        import yt_dlp
+        ydl = cache['ydl'].instance = yt_dlp.YoutubeDL({
+            'quiet': True,
+            'no_warnings': True,
+            'noplaylist': True,
+        })
+    return ydl
+
+@st.cache_resource
+def _get_info_executor():
+    """Get the thread pool used for video info lookups"""
+    return ThreadPoolExecutor(max_workers=MAX_PARALLEL_LOOKUPS)
+
+@st.cache_resource
+def _get_download_executor():
+    """Get the thread pool used for downloads
+    
+    Kept apart from the lookups, so running downloads never hold them up.
+    """
+    return ThreadPoolExecutor(max_workers=MAX_PARALLEL_DOWNLOADS)
+
+def _extract_info(url, cache):
+    """Extract video information, cached per URL for INFO_CACHE_TTL seconds
+    
+    Errors are raised rather than cached, so a failed lookup can be retried.
+    """
+    with cache['lock']:
+        entry = cache['entries'].get(url)
+    if entry is not None and time.monotonic() - entry[0] < INFO_CACHE_TTL:
+        return entry[1]
+    
+    ydl = _get_ydl(cache)
+    info = ydl.sanitize_info(ydl.extract_info(url, download=False))
+    with cache['lock']:
+        entries = cache['entries']
+        entries.pop(url, None)
+        entries[url] = (time.monotonic(), info)
+        # Entries are in insertion order, so the first one is the oldest
+        while len(entries) > INFO_CACHE_SIZE:
+            del entries[next(iter(entries))]
+    return info
+
+def get_video_info(url, cache):
     """Get video information without downloading"""
-    ydl_opts = {
-        'quiet': True,
-        'no_warnings': True,
-        'noplaylist': True,
-    }
+    import yt_dlp
     
     try:
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-            return {
-                'success': True,
-                'title': info.get('title', 'Unknown'),
-                'channel': info.get('channel', 'Unknown'),
-                'duration': info.get('duration', 0),
-                'thumbnail': info.get('thumbnail', ''),
-                'views': info.get('view_count', 0),
-                'description': info.get('description', '')[:200] + '...',
-            }
+        info = _extract_info(url, cache)
+        description = info.get('description') or ''
+        if len(description) > 200:
+            description = description[:200] + '...'
+        
+        return {
+            'success': True,
+            'title': info.get('title', 'Unknown'),
+            'channel': info.get('channel', 'Unknown'),
+            'duration': info.get('duration', 0),
+            'thumbnail': info.get('thumbnail', ''),
+            'views': info.get('view_count', 0),
+            'description': description,
+            # Without the format selection made here (requested_formats etc.),
+            # so a download picks formats for its own quality
+            'raw': {
+                **yt_dlp.YoutubeDL.sanitize_info(info, remove_private_keys=True),
+                # Kept for the progress hook, which tracks downloads by it
+                'original_url': info.get('original_url', url),
+            },
+        }
     except Exception as e:
         return {
             'success': False,
@@ -102,39 +192,172 @@ def format_duration(seconds):
     """Format duration in seconds to HH:MM:SS"""
     if not seconds:
         return "Unknown"
-    hours = seconds // 3600
-    minutes = (seconds % 3600) // 60
-    secs = seconds % 60
+    minutes, secs = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
     if hours > 0:
         return f"{hours:02d}:{minutes:02d}:{secs:02d}"
     return f"{minutes:02d}:{secs:02d}"
 
-def download_video(url, quality, output_path):
-    """Download a YouTube video"""
-    os.makedirs(output_path, exist_ok=True)
+def prefetch_video_info(urls, retry_failed=False):
+    """Start fetching video info in the background for any new URLs
     
-    ydl_opts = {
-        'format': get_quality_format(quality),
-        'outtmpl': f'{output_path}/%(title)s_%(height)sp.%(ext)s',
-        'merge_output_format': 'mp4',
-        'quiet': False,
-        'no_warnings': False,
-        'noplaylist': True,
-    }
+    With retry_failed, a lookup that failed is started again, so a retry
+    needs no URL change. Plain reruns leave it alone, so that one bad URL
+    is not extracted again on every widget change.
+    """
+    futures = st.session_state.get('info_futures', {})
+    pending = {}
+    for u in urls:
+        future = futures.get(u)
+        failed = future is not None and future.done() and not future.result()['success']
+        if future is None or (retry_failed and failed):
+            future = _get_info_executor().submit(get_video_info, u, _get_info_cache())
+        pending[u] = future
+    # Lookups of URLs removed from the text area should not hold up a worker
+    for u, future in futures.items():
+        if u not in pending:
+            future.cancel()
+    st.session_state['info_futures'] = pending
+    return pending
+
+def get_downloads():
+    """Get this session's downloads, kept across reruns
+    
+    The download threads can not reach st.session_state, so they update the
+    progress and read the cancelled URLs through this same dict.
+    """
+    if 'downloads' not in st.session_state:
+        st.session_state['downloads'] = {
+            'futures': {},      # URL -> future of download_video
+            'progress': {},     # URL -> {format ID: (downloaded bytes, total bytes)}
+            'cancelled': set(), # URLs whose download the user asked to stop
+        }
+    return st.session_state['downloads']
+
+def _plan_progress(downloads, info_dict, *, incomplete):
+    """Record the sizes of the formats yt-dlp is about to download
     
+    Used as a match_filter, which yt-dlp calls once the formats are chosen.
+    Video and audio are downloaded one after the other, so the progress is
+    measured against both sizes together.
+    """
+    if not incomplete:
+        formats = info_dict.get('requested_formats') or [info_dict]
+        downloads['progress'][info_dict.get('original_url')] = {
+            f.get('format_id'): (0, f.get('filesize') or f.get('filesize_approx') or 0)
+            for f in formats
+        }
+    return None
+
+def _progress_hook(downloads, d):
+    """Record the download progress reported by yt-dlp, stopping it if cancelled"""
+    url = d['info_dict'].get('original_url')
+    if url in downloads['cancelled']:
+        from yt_dlp.utils import DownloadCancelled
+        raise DownloadCancelled()
+    parts = downloads['progress'].get(url, {})
+    format_id = d['info_dict'].get('format_id')
+    if format_id not in parts:
+        # Not one of the planned formats, e.g. ffmpeg fetching them merged
+        parts = {}
+    total = d.get('total_bytes') or d.get('total_bytes_estimate') or parts.get(format_id, (0, 0))[1]
+    # Replaced rather than changed, as the script thread reads it meanwhile
+    downloads['progress'][url] = {**parts, format_id: (d.get('downloaded_bytes', 0), total)}
+
+def download_progress(parts):
+    """Combine the progress of a download's formats into 0.0 - 1.0"""
+    total = sum(size for _, size in parts.values())
+    if not total:
+        return 0.0
+    return min(sum(done for done, _ in parts.values()) / total, 1.0)
+
+def cancel_downloads(downloads):
+    """Stop the running downloads, and drop the ones that have not started"""
+    for url, future in downloads['futures'].items():
+        if not future.done():
+            downloads['cancelled'].add(url)
+            future.cancel()
+
+def get_download_result(future):
+    """Get the result of a download, including one cancelled before it started"""
+    if future.cancelled():
+        return {
+            'success': False,
+            'error': 'Download cancelled'
+        }
+    return future.result()
+
+@st.cache_data(ttl=5)
+def get_folder_stats(output_folder):
+    """Count the MP4 files in a folder and their total size in bytes"""
     try:
+        with os.scandir(output_folder) as it:
+            entries = [e for e in it if e.is_file() and e.name.endswith('.mp4')]
+        if len(entries) > PARALLEL_STAT_THRESHOLD:
+            # Overlap the stat calls, which is much faster on network mounts
+            with ThreadPoolExecutor(max_workers=STAT_WORKERS) as executor:
+                sizes = list(executor.map(lambda e: e.stat().st_size, entries))
+        else:
+            sizes = [e.stat().st_size for e in entries]
+    except OSError:
+        return None
+    return len(sizes), sum(sizes)
+
+@st.fragment(run_every=30)
+def show_folder_stats(output_folder):
+    """Show the folder statistics, refreshed on their own every 30 seconds"""
+    stats = get_folder_stats(output_folder)
+    if stats is not None:
+        count, total_size = stats
+        st.metric("Downloaded Videos", count)
+        
+        if count:
+            st.metric("Total Size", f"{total_size / (1024**3):.2f} GB")
+
+def download_video(quality, output_path, downloads, info):
+    """Download a YouTube video from its already extracted info
+    
+    The fragments and the merge are written to a temporary staging folder,
+    and yt-dlp only moves the finished file into output_path. A video that
+    is already in output_path is not downloaded again.
+    """
+    import yt_dlp
+    
+    staging = None
+    try:
+        staging = tempfile.mkdtemp(prefix='ytdl_')
+        ydl_opts = {
+            'format': QUALITY_FORMATS[quality],
+            'outtmpl': '%(title)s_%(height)sp.%(ext)s',
+            'paths': {'home': output_path, 'temp': staging},
+            'merge_output_format': 'mp4',
+            'quiet': False,
+            'no_warnings': False,
+            'noplaylist': True,
+            'match_filter': functools.partial(_plan_progress, downloads),
+            'progress_hooks': [functools.partial(_progress_hook, downloads)],
+            'concurrent_fragment_downloads': 8,
+            'http_chunk_size': 10 * 1024 * 1024,
+        }
+        
+        # Downloads get their own instance: each has its own format, paths
+        # and progress hook, and instances are not meant to be shared
+        # between the download threads
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=True)
-            return {
-                'success': True,
-                'title': info.get('title', 'Unknown'),
-                'filename': f"{output_path}/{info.get('title', 'Unknown')}_{info.get('height', quality)}p.mp4"
-            }
+            info = ydl.process_ie_result(info, download=True)
+        return {
+            'success': True,
+            'title': info.get('title', 'Unknown'),
+            'filename': info['requested_downloads'][0]['filepath']
+        }
     except Exception as e:
         return {
             'success': False,
             'error': str(e)
         }
+    finally:
+        if staging is not None:
+            shutil.rmtree(staging, ignore_errors=True)
 
 # Main App
 st.title("🎬 YouTube Video Downloader")
@@ -153,13 +376,7 @@ with st.sidebar:
     
     st.markdown("---")
     st.markdown("### 📊 Statistics")
-    if os.path.exists(output_folder):
-        files = list(Path(output_folder).glob("*.mp4"))
-        st.metric("Downloaded Videos", len(files))
-        
-        if files:
-            total_size = sum(f.stat().st_size for f in files) / (1024**3)
-            st.metric("Total Size", f"{total_size:.2f} GB")
+    show_folder_stats(output_folder)
     
     st.markdown("---")
     st.markdown("### ℹ️ About")
@@ -179,52 +396,54 @@ with st.sidebar:
 col1, col2 = st.columns([2, 1])
 
 with col1:
-    url = st.text_input(
-        "🔗 Enter YouTube URL",
-        placeholder="https://www.youtube.com/watch?v=..."
+    urls_text = st.text_area(
+        "🔗 Enter YouTube URLs",
+        placeholder="https://www.youtube.com/watch?v=...",
+        help="One URL per line"
     )
+    urls = [u.strip() for u in urls_text.splitlines() if u.strip()]
 
 with col2:
     quality = st.selectbox(
         "📊 Quality",
-        options=["2160", "1080", "720", "480"],
-        format_func=lambda x: {
-            "2160": "4K (2160p)",
-            "1080": "1080p Full HD",
-            "720": "720p HD",
-            "480": "480p SD"
-        }[x],
+        options=list(QUALITY_LABELS),
+        format_func=QUALITY_LABELS.get,
         index=1
     )
 
+# Start fetching video info while the user decides what to do
+info_futures = prefetch_video_info(urls)
+
 # Get video info button
-if url:
+if urls:
     if st.button("🔍 Get Video Info"):
+        info_futures = prefetch_video_info(urls, retry_failed=True)
         with st.spinner("Fetching video information..."):
-            info = get_video_info(url)
-            
-            if info['success']:
-                st.success("✅ Video found!")
-                
-                # Display video info
-                col1, col2 = st.columns([1, 2])
+            for url in urls:
+                info = info_futures[url].result()
                 
-                with col1:
-                    if info['thumbnail']:
-                        st.image(info['thumbnail'], use_container_width=True)
-                
-                with col2:
-                    st.markdown(f"### {info['title']}")
-                    st.markdown(f"**📺 Channel:** {info['channel']}")
-                    st.markdown(f"**⏱️ Duration:** {format_duration(info['duration'])}")
-                    st.markdown(f"**👁️ Views:** {info['views']:,}")
+                if info['success']:
+                    st.success("✅ Video found!")
                     
-                    with st.expander("📝 Description"):
-                        st.write(info['description'])
-                
-                st.session_state['video_info'] = info
-            else:
-                st.error(f"❌ Error: {info['error']}")
+                    # Display video info
+                    col1, col2 = st.columns([1, 2])
+                    
+                    with col1:
+                        if info['thumbnail']:
+                            st.image(info['thumbnail'], use_container_width=True)
+                    
+                    with col2:
+                        st.markdown(f"### {info['title']}")
+                        st.markdown(f"**📺 Channel:** {info['channel']}")
+                        st.markdown(f"**⏱️ Duration:** {format_duration(info['duration'])}")
+                        st.markdown(f"**👁️ Views:** {info['views']:,}")
+                        
+                        with st.expander("📝 Description"):
+                            st.write(info['description'])
+                    
+                    st.session_state['video_info'] = info
+                else:
+                    st.error(f"❌ Error: {info['error']}")
 
 # Download button
 st.markdown("---")
@@ -232,37 +451,84 @@ st.markdown("---")
 col1, col2, col3 = st.columns([1, 2, 1])
 
 with col2:
-    if st.button("⬇️ Download Video", type="primary", disabled=not url):
-        if url:
-            with st.spinner(f"Downloading in {quality}p quality..."):
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-                
-                status_text.text("🚀 Starting download...")
-                progress_bar.progress(20)
-                
-                result = download_video(url, quality, output_folder)
-                
-                progress_bar.progress(100)
+    downloads = get_downloads()
+    
+    if st.button("⬇️ Download Video", type="primary", disabled=not urls):
+        if urls:
+            info_futures = prefetch_video_info(urls, retry_failed=True)
+            with st.spinner(f"Starting {len(urls)} download(s) in {quality}p quality..."):
+                # Results of earlier downloads are replaced, running ones are kept
+                futures = downloads['futures']
+                for url, future in list(futures.items()):
+                    if future.done():
+                        del futures[url]
                 
-                if result['success']:
-                    st.markdown(f"""
-                    <div class="success-box">
-                        <h2>✅ Download Complete!</h2>
-                        <p>📁 Saved to: {result['filename']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                    
-                    st.balloons()
-                else:
-                    st.markdown(f"""
-                    <div class="error-box">
-                        <h2>❌ Download Failed</h2>
-                        <p>{result['error']}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
+                for url in urls:
+                    if url in futures:
+                        continue
+                    info = info_futures[url].result()
+                    downloads['cancelled'].discard(url)
+                    downloads['progress'][url] = {}
+                    if info['success']:
+                        futures[url] = _get_download_executor().submit(
+                            download_video, quality, output_folder, downloads, info['raw']
+                        )
+                    else:
+                        # The lookup was just retried, so report it rather than
+                        # extracting a third time
+                        futures[url] = Future()
+                        futures[url].set_result(info)
         else:
             st.warning("⚠️ Please enter a YouTube URL first!")
+    
+    # Shown on every rerun, so other interactions do not lose the downloads
+    if downloads['futures']:
+        progress_bars = {url: st.progress(0, text=url) for url in downloads['futures']}
+        running = not all(future.done() for future in downloads['futures'].values())
+        
+        if running:
+            # Clicking reruns the script, so the stop happens in the callback
+            st.button("⏹️ Stop Download", on_click=cancel_downloads, args=(downloads,))
+            
+            with st.spinner(f"Downloading {len(downloads['futures'])} video(s)..."):
+                # Poll the download threads and update the progress bars
+                while not all(future.done() for future in downloads['futures'].values()):
+                    for url, progress_bar in progress_bars.items():
+                        progress = download_progress(downloads['progress'].get(url, {}))
+                        progress_bar.progress(int(progress * 100), text=url)
+                    time.sleep(0.25)
+        
+        for url, future in downloads['futures'].items():
+            result = get_download_result(future)
+            
+            if result['success']:
+                progress_bars[url].progress(100, text=url)
+                st.markdown(f"""
+                <div class="success-box">
+                    <h2>✅ Download Complete!</h2>
+                    <p>📁 Saved to: {result['filename']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+            elif url in downloads['cancelled']:
+                st.markdown(f"""
+                <div class="error-box">
+                    <h2>⏹️ Download Cancelled</h2>
+                    <p>{url}</p>
+                </div>
+                """, unsafe_allow_html=True)
+            else:
+                st.markdown(f"""
+                <div class="error-box">
+                    <h2>❌ Download Failed</h2>
+                    <p>{result['error']}</p>
+                </div>
+                """, unsafe_allow_html=True)
+        
+        # Only celebrate in the run that saw the downloads finish
+        if running and any(
+            get_download_result(future)['success'] for future in downloads['futures'].values()
+        ):
+            st.balloons()
 
 # Footer
 st.markdown("---")